@@ -1,6 +1,8 @@
+import logging
 import os
 import re
 import shutil
+import sqlite3
 
 import pytest
 from click.testing import CliRunner
@@ -13,96 +15,46 @@ from great_expectations.util import gen_directory_tree_str
 from tests.cli.test_cli import yaml
 from tests.cli.test_datasource_sqlite import _add_datasource_and_credentials_to_context
 from tests.cli.test_init_pandas import _delete_and_recreate_dir
-from tests.cli.utils import assert_no_logging_messages_or_tracebacks
+from tests.cli.utils import (
+    assert_no_logging_messages_or_tracebacks,
+    assert_no_tracebacks,
+)
 
 try:
     from unittest import mock
 except ImportError:
     from unittest import mock
 
-
-@pytest.fixture
-def titanic_sqlite_db_file(sa, tmp_path_factory):
-    temp_dir = str(tmp_path_factory.mktemp("foo_path"))
-    fixture_db_path = file_relative_path(__file__, "../test_sets/titanic.db")
-
-    db_path = os.path.join(temp_dir, "titanic.db")
-    shutil.copy(fixture_db_path, db_path)
-
-    engine = sa.create_engine("sqlite:///{}".format(db_path), pool_recycle=3600)
-    assert engine.execute("select count(*) from titanic").fetchall()[0] == (1313,)
-    return db_path
-
-
-@mock.patch("webbrowser.open", return_value=True, side_effect=None)
-@freeze_time("09/26/2019 13:42:41")
-def test_cli_init_on_new_project(
-    mock_webbrowser, caplog, tmp_path_factory, titanic_sqlite_db_file, sa
-):
-    project_dir = str(tmp_path_factory.mktemp("test_cli_init_diff"))
-    ge_dir = os.path.join(project_dir, "great_expectations")
-
-    database_path = os.path.join(project_dir, "titanic.db")
-    shutil.copy(titanic_sqlite_db_file, database_path)
-    engine = sa.create_engine("sqlite:///{}".format(database_path), pool_recycle=3600)
-
-    runner = CliRunner(mix_stderr=False)
-    result = runner.invoke(
-        cli,
-        ["init", "-d", project_dir],
-        input="\n\n2\n6\ntitanic\n{}\n\n\n1\nwarning\n\n\n\n".format(engine.url),
-        catch_exceptions=False,
-    )
-    stdout = result.output
-    assert len(stdout) < 6000, "CLI output is unreasonably long."
-
-    assert "Always know what to expect from your data" in stdout
-    assert "What data would you like Great Expectations to connect to" in stdout
-    assert "Which database backend are you using" in stdout
-    assert "Give your new Datasource a short name" in stdout
-    assert "What is the url/connection string for the sqlalchemy connection" in stdout
-    assert "Attempting to connect to your database." in stdout
-    assert "Great Expectations connected to your database" in stdout
-    assert "Which table would you like to use?" in stdout
-    assert "Name the new Expectation Suite [main.titanic.warning]" in stdout
-    assert (
-        "Great Expectations will choose a couple of columns and generate expectations about them"
-        in stdout
+_EXPECTED_INIT_PHRASES = (
+    "Always know what to expect from your data",
+    "What data would you like Great Expectations to connect to",
+    "Which database backend are you using",
+    "Give your new Datasource a short name",
+    "What is the url/connection string for the sqlalchemy connection",
+    "Attempting to connect to your database.",
+    "Great Expectations connected to your database",
+    "Which table would you like to use?",
+    "Name the new Expectation Suite [main.titanic.warning]",
+    "Great Expectations will choose a couple of columns and generate expectations about them",
+    "Generating example Expectation Suite...",
+    "Building",
+    "Data Docs",
+    "Great Expectations is now set up",
+)
+# Longest phrases first so a shorter phrase never shadows a longer one.
+_INIT_PATTERN = re.compile(
+    "|".join(
+        re.escape(phrase)
+        for phrase in sorted(_EXPECTED_INIT_PHRASES, key=len, reverse=True)
     )
-    assert "Generating example Expectation Suite..." in stdout
-    assert "Building" in stdout
-    assert "Data Docs" in stdout
-    assert "Great Expectations is now set up" in stdout
-
-    context = DataContext(ge_dir)
-    assert len(context.list_datasources()) == 1
-    assert context.list_datasources()[0]["class_name"] == "SqlAlchemyDatasource"
-    assert context.list_datasources()[0]["name"] == "titanic"
-
-    first_suite = context.list_expectation_suites()[0]
-    suite = context.get_expectation_suite(first_suite.expectation_suite_name)
-    assert len(suite.expectations) == 14
-
-    assert os.path.isdir(ge_dir)
-    config_path = os.path.join(project_dir, "great_expectations/great_expectations.yml")
-    assert os.path.isfile(config_path)
+)
 
-    config = yaml.load(open(config_path))
-    data_source_class = config["datasources"]["titanic"]["data_asset_type"][
-        "class_name"
-    ]
-    assert data_source_class == "SqlAlchemyDataset"
+# Guards the fixtures that pytest-xdist workers share in the common temp root.
+_XDIST_LOCK_FILE = "test_init_sqlite.lock"
 
-    obs_tree = gen_directory_tree_str(ge_dir)
+_GUID_RE = re.compile(r"[a-z0-9]{32}(?=\.(?:json|html))")
 
-    # Instead of monkey patching guids, just regex out the guids
-    guid_safe_obs_tree = re.sub(
-        r"[a-z0-9]{32}(?=\.(json|html))", "foobarbazguid", obs_tree
-    )
-    # print(guid_safe_obs_tree)
-    assert (
-        guid_safe_obs_tree
-        == """\
+_EXPECTED_TREE = """\
 great_expectations/
     .gitignore
     great_expectations.yml
@@ -167,18 +119,116 @@ great_expectations/
                     20190926T134241.000000Z/
                         foobarbazguid.json
 """
+
+
+def _skip_unless_sqlalchemy(config):
+    """Session-scoped stand-in for the function-scoped sa fixture.
+
+    Session fixtures are set up before sa gets a chance to skip, so they
+    check the sqlalchemy selection themselves.
+    """
+    if config.getoption("--no-sqlalchemy"):
+        pytest.skip("sqlalchemy tests are disabled with --no-sqlalchemy")
+    pytest.importorskip("sqlalchemy")
+
+
+@pytest.fixture(scope="session")
+def titanic_sqlite_db_file(pytestconfig, tmp_path_factory):
+    """A single master copy of the titanic db shared by the whole session.
+
+    Tests that need to write to the db should copy it into their own tmp dir.
+    Under pytest-xdist the master copy lives in the temp root shared by all
+    workers, so the golden project's datasource url is valid on every worker.
+    """
+    _skip_unless_sqlalchemy(pytestconfig)
+
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        return _create_titanic_db(tmp_path_factory)
+
+    from filelock import FileLock
+
+    root_dir = _xdist_shared_root(tmp_path_factory)
+    db_path = os.path.join(root_dir, "titanic.db")
+    with FileLock(os.path.join(root_dir, _XDIST_LOCK_FILE)):
+        if not os.path.isfile(db_path):
+            shutil.move(_create_titanic_db(tmp_path_factory), db_path)
+    return db_path
+
+
+def _create_titanic_db(tmp_path_factory):
+    temp_dir = str(tmp_path_factory.mktemp("foo_path"))
+    fixture_db_path = file_relative_path(__file__, "../test_sets/titanic.db")
+
+    db_path = os.path.join(temp_dir, "titanic.db")
+    shutil.copy(fixture_db_path, db_path)
+
+    con = sqlite3.connect(db_path)
+    try:
+        assert con.execute("select count(*) from titanic").fetchone() == (1313,)
+    finally:
+        con.close()
+    return db_path
+
+
+def _xdist_shared_root(tmp_path_factory):
+    """The temp dir that contains the basetemp of every pytest-xdist worker."""
+    return str(tmp_path_factory.getbasetemp().parent)
+
+
+@mock.patch("webbrowser.open", return_value=True, side_effect=None)
+@freeze_time("09/26/2019 13:42:41")
+def test_cli_init_on_new_project(
+    mock_webbrowser, caplog, tmp_path_factory, titanic_sqlite_db_file, sa
+):
+    project_dir = str(tmp_path_factory.mktemp("test_cli_init_diff"))
+    ge_dir = os.path.join(project_dir, "great_expectations")
+
+    database_path = os.path.join(project_dir, "titanic.db")
+    _fast_copy(titanic_sqlite_db_file, database_path)
+    engine = sa.create_engine("sqlite:///{}".format(database_path), pool_recycle=3600)
+
+    runner = CliRunner(mix_stderr=False)
+    result = runner.invoke(
+        cli,
+        ["init", "-d", project_dir],
+        input="\n\n2\n6\ntitanic\n{}\n\n\n1\nwarning\n\n\n\n".format(engine.url),
+        catch_exceptions=False,
+    )
+    stdout = result.output
+    assert len(stdout) < 6000, "CLI output is unreasonably long."
+
+    found = set(_INIT_PATTERN.findall(stdout))
+    assert set(_EXPECTED_INIT_PHRASES) <= found, set(_EXPECTED_INIT_PHRASES) - found
+
+    context = DataContext(ge_dir)
+    assert len(context.list_datasources()) == 1
+    assert context.list_datasources()[0]["class_name"] == "SqlAlchemyDatasource"
+    assert context.list_datasources()[0]["name"] == "titanic"
+    assert (
+        context.list_datasources()[0]["data_asset_type"]["class_name"]
+        == "SqlAlchemyDataset"
     )
 
+    first_suite = context.list_expectation_suites()[0]
+    suite = context.get_expectation_suite(first_suite.expectation_suite_name)
+    assert len(suite.expectations) == 14
+
+    assert os.path.isdir(ge_dir)
+    config_path = os.path.join(project_dir, "great_expectations/great_expectations.yml")
+    assert os.path.isfile(config_path)
+
+    obs_tree = gen_directory_tree_str(ge_dir)
+
+    # Instead of monkey patching guids, just regex out the guids
+    guid_safe_obs_tree = _GUID_RE.sub("foobarbazguid", obs_tree)
+    # print(guid_safe_obs_tree)
+    assert guid_safe_obs_tree == _EXPECTED_TREE
+
     assert_no_logging_messages_or_tracebacks(caplog, result)
 
     assert result.exit_code == 0
     assert mock_webbrowser.call_count == 1
-    assert (
-        "{}/great_expectations/uncommitted/data_docs/local_site/validations/warning/".format(
-            project_dir
-        )
-        in mock_webbrowser.call_args[0][0]
-    )
+    assert _validations_url(project_dir, "warning") in mock_webbrowser.call_args[0][0]
 
 
 @mock.patch("webbrowser.open", return_value=True, side_effect=None)
@@ -189,7 +239,7 @@ def test_cli_init_on_new_project_extra_whitespace_in_url(
     ge_dir = os.path.join(project_dir, "great_expectations")
 
     database_path = os.path.join(project_dir, "titanic.db")
-    shutil.copy(titanic_sqlite_db_file, database_path)
+    _fast_copy(titanic_sqlite_db_file, database_path)
     engine = sa.create_engine("sqlite:///{}".format(database_path), pool_recycle=3600)
     engine_url_with_added_whitespace = "    " + str(engine.url) + "  "
 
@@ -205,23 +255,8 @@ def test_cli_init_on_new_project_extra_whitespace_in_url(
     stdout = result.output
     assert len(stdout) < 6000, "CLI output is unreasonably long."
 
-    assert "Always know what to expect from your data" in stdout
-    assert "What data would you like Great Expectations to connect to" in stdout
-    assert "Which database backend are you using" in stdout
-    assert "Give your new Datasource a short name" in stdout
-    assert "What is the url/connection string for the sqlalchemy connection" in stdout
-    assert "Attempting to connect to your database." in stdout
-    assert "Great Expectations connected to your database" in stdout
-    assert "Which table would you like to use?" in stdout
-    assert "Name the new Expectation Suite [main.titanic.warning]" in stdout
-    assert (
-        "Great Expectations will choose a couple of columns and generate expectations about them"
-        in stdout
-    )
-    assert "Generating example Expectation Suite..." in stdout
-    assert "Building" in stdout
-    assert "Data Docs" in stdout
-    assert "Great Expectations is now set up" in stdout
+    found = set(_INIT_PATTERN.findall(stdout))
+    assert set(_EXPECTED_INIT_PHRASES) <= found, set(_EXPECTED_INIT_PHRASES) - found
 
     context = DataContext(ge_dir)
     assert len(context.list_datasources()) == 1
@@ -246,22 +281,11 @@ def test_cli_init_on_new_project_extra_whitespace_in_url(
     config_path = os.path.join(project_dir, "great_expectations/great_expectations.yml")
     assert os.path.isfile(config_path)
 
-    config = yaml.load(open(config_path))
-    data_source_class = config["datasources"]["titanic"]["data_asset_type"][
-        "class_name"
-    ]
-    assert data_source_class == "SqlAlchemyDataset"
-
     assert_no_logging_messages_or_tracebacks(caplog, result)
 
     assert result.exit_code == 0
     assert mock_webbrowser.call_count == 1
-    assert (
-        "{}/great_expectations/uncommitted/data_docs/local_site/validations/warning/".format(
-            project_dir
-        )
-        in mock_webbrowser.call_args[0][0]
-    )
+    assert _validations_url(project_dir, "warning") in mock_webbrowser.call_args[0][0]
 
 
 @mock.patch("webbrowser.open", return_value=True, side_effect=None)
@@ -291,12 +315,7 @@ def test_init_on_existing_project_with_no_datasources_should_continue_init_flow_
 
     assert result.exit_code == 0
     assert mock_webbrowser.call_count == 1
-    assert (
-        "{}/great_expectations/uncommitted/data_docs/local_site/validations/my_suite/".format(
-            project_dir
-        )
-        in mock_webbrowser.call_args[0][0]
-    )
+    assert _validations_url(project_dir, "my_suite") in mock_webbrowser.call_args[0][0]
 
     assert "Error: invalid input" not in stdout
     assert "Always know what to expect from your data" in stdout
@@ -332,6 +351,24 @@ def test_init_on_existing_project_with_no_datasources_should_continue_init_flow_
     assert_no_logging_messages_or_tracebacks(caplog, result)
 
 
+def _fast_copy(src, dst):
+    """Hardlink src to dst, falling back to a real copy.
+
+    Only use this for files the test never writes to, since a hardlink shares
+    the underlying file with src.
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy(src, dst)
+
+
+def _validations_url(project_dir, suite_name):
+    return "{}/great_expectations/uncommitted/data_docs/local_site/validations/{}/".format(
+        project_dir, suite_name
+    )
+
+
 def _remove_all_datasources(ge_dir):
     config_path = os.path.join(ge_dir, DataContext.GE_YML)
 
@@ -349,42 +386,46 @@ def _load_config_file(config_path):
     assert os.path.isfile(config_path), "Config file is missing. Check path"
 
     with open(config_path) as f:
-        read = f.read()
-        config = yaml.load(read)
+        config = yaml.load(f)
 
     assert isinstance(config, dict)
     return config
 
 
-@pytest.fixture
-@mock.patch("webbrowser.open", return_value=True, side_effect=None)
-def initialized_sqlite_project(
-    mock_webbrowser, caplog, tmp_path_factory, titanic_sqlite_db_file, sa
-):
-    """This is an initialized project through the CLI."""
-    project_dir = str(tmp_path_factory.mktemp("my_rad_project"))
+class _RecordingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
 
-    engine = sa.create_engine(
-        "sqlite:///{}".format(titanic_sqlite_db_file), pool_recycle=3600
-    )
+    def emit(self, record):
+        self.records.append(record)
 
-    runner = CliRunner(mix_stderr=False)
-    result = runner.invoke(
-        cli,
-        ["init", "-d", project_dir],
-        input="\n\n2\n6\ntitanic\n{}\n\n\n1\nwarning\n\n\n\n".format(engine.url),
-        catch_exceptions=False,
-    )
+
+@mock.patch("webbrowser.open", return_value=True, side_effect=None)
+def _init_sqlite_project(project_dir, db_path, mock_webbrowser):
+    url = "sqlite:///{}".format(db_path)
+
+    # caplog is function scoped, so record log output with our own handler.
+    log_handler = _RecordingHandler()
+    root_logger = logging.getLogger()
+    root_logger.addHandler(log_handler)
+    try:
+        runner = CliRunner(mix_stderr=False)
+        result = runner.invoke(
+            cli,
+            ["init", "-d", project_dir],
+            input="\n\n2\n6\ntitanic\n{}\n\n\n1\nwarning\n\n\n\n".format(url),
+            catch_exceptions=False,
+        )
+    finally:
+        root_logger.removeHandler(log_handler)
     assert result.exit_code == 0
     assert mock_webbrowser.call_count == 1
-    assert (
-        "{}/great_expectations/uncommitted/data_docs/local_site/validations/warning/".format(
-            project_dir
-        )
-        in mock_webbrowser.call_args[0][0]
-    )
+    assert _validations_url(project_dir, "warning") in mock_webbrowser.call_args[0][0]
 
-    assert_no_logging_messages_or_tracebacks(caplog, result)
+    messages = [record.getMessage() for record in log_handler.records]
+    assert not messages, "Found logging messages:\n{}".format("\n".join(messages))
+    assert_no_tracebacks(result)
 
     context = DataContext(os.path.join(project_dir, DataContext.GE_DIR))
     assert isinstance(context, DataContext)
@@ -394,13 +435,54 @@ def initialized_sqlite_project(
             "class_name": "SqlAlchemyDatasource",
             "name": "titanic",
             "module_name": "great_expectations.datasource",
-            "credentials": {"url": str(engine.url)},
+            "credentials": {"url": url},
             "data_asset_type": {
                 "class_name": "SqlAlchemyDataset",
                 "module_name": "great_expectations.dataset",
             },
         }
     ]
+
+
+@pytest.fixture(scope="session")
+def _golden_initialized_project(
+    pytestconfig, tmp_path_factory, titanic_sqlite_db_file
+):
+    """A project initialized through the CLI once per session.
+
+    Under pytest-xdist every worker has its own session, so the project is
+    built once in the shared temp root and reused by all workers, next to the
+    shared titanic db it points at.
+
+    Do not use this directly, use initialized_sqlite_project to get a copy.
+    """
+    _skip_unless_sqlalchemy(pytestconfig)
+
+    if not os.environ.get("PYTEST_XDIST_WORKER"):
+        project_dir = str(tmp_path_factory.mktemp("my_rad_project"))
+        _init_sqlite_project(project_dir, titanic_sqlite_db_file)
+        return project_dir
+
+    from filelock import FileLock
+
+    root_dir = _xdist_shared_root(tmp_path_factory)
+    project_dir = os.path.join(root_dir, "golden_sqlite_project")
+    with FileLock(os.path.join(root_dir, _XDIST_LOCK_FILE)):
+        if not os.path.isdir(project_dir):
+            # Build aside and rename so a failed build is never reused.
+            staging_dir = str(tmp_path_factory.mktemp("my_rad_project"))
+            _init_sqlite_project(staging_dir, titanic_sqlite_db_file)
+            shutil.move(staging_dir, project_dir)
+    return project_dir
+
+
+@pytest.fixture
+def initialized_sqlite_project(sa, tmp_path_factory, _golden_initialized_project):
+    """This is a private copy of a project initialized through the CLI."""
+    project_dir = os.path.join(
+        str(tmp_path_factory.mktemp("my_rad_project")), "project"
+    )
+    shutil.copytree(_golden_initialized_project, project_dir)
     return project_dir
 
 
@@ -472,9 +554,29 @@ def test_init_on_existing_project_with_datasource_with_existing_suite_offer_to_b
     assert_no_logging_messages_or_tracebacks(caplog, result)
 
 
+@pytest.fixture
+def mock_site_builder():
+    """Replace the Data Docs build with a stub that only writes the index page."""
+
+    def _write_stub_index_page(site_builder, resource_identifiers=None):
+        index_page_url = site_builder.get_resource_url(only_if_exists=False)
+        index_page_path = index_page_url[len("file://") :]
+        os.makedirs(os.path.dirname(index_page_path), exist_ok=True)
+        with open(index_page_path, "w") as f:
+            f.write("<html/>")
+        return index_page_url, {}
+
+    with mock.patch(
+        "great_expectations.render.renderer.site_builder.SiteBuilder.build",
+        autospec=True,
+        side_effect=_write_stub_index_page,
+    ) as mock_build:
+        yield mock_build
+
+
 @mock.patch("webbrowser.open", return_value=True, side_effect=None)
 def test_init_on_existing_project_with_datasource_with_existing_suite_offer_to_build_docs_answer_yes(
-    mock_webbrowser, caplog, initialized_sqlite_project,
+    mock_webbrowser, caplog, initialized_sqlite_project, mock_site_builder,
 ):
     project_dir = initialized_sqlite_project
 
@@ -489,6 +591,7 @@ def test_init_on_existing_project_with_datasource_with_existing_suite_offer_to_b
 
     assert result.exit_code == 0
     assert mock_webbrowser.call_count == 1
+    assert mock_site_builder.call_count == 1
     assert (
         "{}/great_expectations/uncommitted/data_docs/local_site/index.html".format(
             project_dir
@@ -542,12 +645,7 @@ def test_init_on_existing_project_with_datasource_with_no_suite_create_one(
 
     assert result.exit_code == 0
     assert mock_webbrowser.call_count == 1
-    assert (
-        "{}/great_expectations/uncommitted/data_docs/local_site/validations/sink_me/".format(
-            project_dir
-        )
-        in mock_webbrowser.call_args[0][0]
-    )
+    assert _validations_url(project_dir, "sink_me") in mock_webbrowser.call_args[0][0]
 
     assert "Always know what to expect from your data" in stdout
     assert "Which table would you like to use?" in stdout